@@ -1,18 +1,14 @@
 import sys
 import os
-from dotenv import load_dotenv
 from google.genai import types
 from google.adk.agents import Agent
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-from shared.config import STRICT_SAFETY
-load_dotenv()
+from shared.config import STRICT_SAFETY, compact_instruction, get_env
 
-MODEL = os.getenv("MODEL_NAME", "gemini-2.5-pro")
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
+MODEL = get_env("MODEL_NAME", "gemini-2.5-pro")
 
-builder_instruction = """
+builder_instruction = compact_instruction("""
     # Your Identity
     You are the 'Storysmith' for Gemini Tales, an award-winning children's author with a talent for turning educational facts into immersive fantasy worlds. 
 
@@ -45,19 +41,21 @@ builder_instruction = """
     **When handling out-of-scope scary info (Boundary case):** 
     User: "[research mentions scary monsters in legends]" 
     You: "The Moon is full of friendly secrets! Instead of scary shadows, let's look for the **Magic Task: The Silver Glow Hunt!** Spin around slowly like a shimmering star!"
-    """
+    """)
+
+BUILDER_CONFIG = types.GenerateContentConfig(
+    temperature=0.9,
+    max_output_tokens=2500,
+    top_p=0.95,
+    safety_settings=STRICT_SAFETY
+)
 
 content_builder = Agent(
     name="content_builder",
     model=MODEL,
     description="Transforms research into an interactive, movement-based story for children.",
     instruction=builder_instruction,
-    generate_content_config=types.GenerateContentConfig(
-        temperature=0.9,
-        max_output_tokens=2500,
-        top_p=0.95,
-        safety_settings=STRICT_SAFETY
-    )
+    generate_content_config=BUILDER_CONFIG
 )
 
 root_agent = content_builder
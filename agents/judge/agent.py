@@ -1,22 +1,16 @@
 import sys
 import os
-from dotenv import load_dotenv
-from typing import Literal
 from google.genai import types
 from google.adk.agents import Agent
 from google.adk.apps.app import App
-from pydantic import BaseModel, Field
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-from shared.config import STRICT_SAFETY
+from shared.config import STRICT_SAFETY, compact_instruction, get_env
+from shared.schemas import JudgeFeedback
 
-load_dotenv()
+MODEL = get_env("MODEL_NAME_FLASH", "gemini-2.5-flash")
 
-MODEL = os.getenv("MODEL_NAME_FLASH", "gemini-2.5-flash")
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
-
-judge_instruction = """
+judge_instruction = compact_instruction("""
     # Your Identity
     You are the 'Guardian of Balance', a senior safety officer and children's fitness expert with 10 years of experience in physical education. 
 
@@ -49,17 +43,14 @@ judge_instruction = """
     **When movement is missing (Boundary case):** 
     User: "[findings with only dates and numbers]" 
     You: "{ "status": "fail", "feedback": "This is too academic. Please add at least two 'Let's Move' sections with physical actions like crawling or balancing." }"
-    """
+    """)
 
-# 1. Define the Schema
-class JudgeFeedback(BaseModel):
-    """Structured feedback from the Judge agent."""
-    status: Literal["pass", "fail"] = Field(
-        description="Whether the research is sufficient ('pass') or needs more work ('fail')."
-    )
-    feedback: str = Field(
-        description="Detailed feedback on what is missing. If 'pass', a brief confirmation."
-    )
+# 1. Define the generation config once so every request reuses it
+JUDGE_CONFIG = types.GenerateContentConfig(
+    temperature=0.1,
+    max_output_tokens=500,
+    safety_settings=STRICT_SAFETY
+)
 
 # 2. Define the Agent
 judge = Agent(
@@ -71,11 +62,7 @@ judge = Agent(
     # Disallow delegation because it should only output the schema
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True,
-    generate_content_config=types.GenerateContentConfig(
-        temperature=0.1,
-        max_output_tokens=500,
-        safety_settings=STRICT_SAFETY
-    )
+    generate_content_config=JUDGE_CONFIG
 )
 
 root_agent = judge
@@ -1,20 +1,22 @@
+import asyncio
+import logging
+import sys
 import os
-from dotenv import load_dotenv
-import json
 from typing import AsyncGenerator
+from pydantic import ValidationError
 from google.adk.agents import BaseAgent, LoopAgent, SequentialAgent
 from google.adk.agents.remote_a2a_agent import RemoteA2aAgent
 from google.adk.events import Event, EventActions
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.agents.callback_context import CallbackContext
 
-from authenticated_httpx import create_authenticated_client
+from authenticated_httpx import get_or_create_authenticated_client
 
-load_dotenv()
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from shared.config import get_env
+from shared.schemas import JudgeFeedback
 
-MODEL = os.getenv("MODEL_NAME", "gemini-2.5-pro")
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
+logger = logging.getLogger(__name__)
 
 # --- Callbacks ---
 def create_save_output_callback(key: str):
@@ -26,22 +28,22 @@ def create_save_output_callback(key: str):
             if event.author == ctx.agent_name and event.content and event.content.parts:
                 text = event.content.parts[0].text
                 if text:
-                    # Try to parse as JSON if it looks like it, for judge_feedback
-                    if key == "judge_feedback" and text.strip().startswith("{"):
+                    # The judge answers with its JudgeFeedback output schema
+                    if key == "judge_feedback":
                         try:
-                            ctx.state[key] = json.loads(text)
-                        except json.JSONDecodeError:
+                            ctx.state[key] = JudgeFeedback.model_validate_json(text).model_dump()
+                        except ValidationError:
                             ctx.state[key] = text
                     else:
                         ctx.state[key] = text
-                    print(f"[{ctx.agent_name}] Saved output to state['{key}']")
+                    logger.debug("[%s] Saved output to state['%s']", ctx.agent_name, key)
                     return
     return callback
 
 # --- Remote Agents ---
 
 # Adventure Seeker (Researcher)
-researcher_url = os.environ.get("RESEARCHER_AGENT_CARD_URL", "http://localhost:8001/a2a/agent/.well-known/agent-card.json")
+researcher_url = get_env("RESEARCHER_AGENT_CARD_URL", "http://localhost:8001/a2a/agent/.well-known/agent-card.json")
 researcher = RemoteA2aAgent(
     name="researcher",
     agent_card=researcher_url,
@@ -49,28 +51,57 @@ researcher = RemoteA2aAgent(
     # IMPORTANT: Save the output to state for the Judge to see
     after_agent_callback=create_save_output_callback("research_findings"),
     # IMPORTANT: Use authenticated client for communication
-    httpx_client=create_authenticated_client(researcher_url)
+    httpx_client=get_or_create_authenticated_client(researcher_url)
 )
 
 # Guardian of Balance (Judge)
-judge_url = os.environ.get("JUDGE_AGENT_CARD_URL", "http://localhost:8002/a2a/agent/.well-known/agent-card.json")
+judge_url = get_env("JUDGE_AGENT_CARD_URL", "http://localhost:8002/a2a/agent/.well-known/agent-card.json")
 judge = RemoteA2aAgent(
     name="judge",
     agent_card=judge_url,
     description="Ensures the story is active and safe.",
     after_agent_callback=create_save_output_callback("judge_feedback"),
-    httpx_client=create_authenticated_client(judge_url)
+    httpx_client=get_or_create_authenticated_client(judge_url)
 )
 
 # Storysmith (Content Builder)
-content_builder_url = os.environ.get("BUILDER_AGENT_CARD_URL", "http://localhost:8003/a2a/agent/.well-known/agent-card.json")
+content_builder_url = get_env("BUILDER_AGENT_CARD_URL", "http://localhost:8003/a2a/agent/.well-known/agent-card.json")
+content_builder_client = get_or_create_authenticated_client(content_builder_url)
 content_builder = RemoteA2aAgent(
     name="content_builder",
     agent_card=content_builder_url,
     description="Weaves the findings into a magical adventure story.",
-    httpx_client=create_authenticated_client(content_builder_url)
+    httpx_client=content_builder_client
 )
 
+# --- Content Builder Warm-up ---
+
+_warmup_tasks: set[asyncio.Task] = set()
+
+async def _warm_up_content_builder() -> None:
+    # Best-effort and never awaited: identity token errors (google-auth
+    # TransportError/RefreshError, ValueError) must not escape the task either
+    try:
+        await content_builder_client.get(content_builder_url)
+    except Exception as e:
+        logger.warning("[content_builder_warmup] Warm-up failed: %r", e)
+
+class ContentBuilderWarmup(BaseAgent):
+    """Opens the Storysmith connection in the background while research runs."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        # Fetching the agent card sets up TCP/TLS and the identity token, so the
+        # content builder call does not pay for them after the research loop
+        task = asyncio.create_task(_warm_up_content_builder())
+        _warmup_tasks.add(task)
+        task.add_done_callback(_warmup_tasks.discard)
+        return
+        yield
+
+content_builder_warmup = ContentBuilderWarmup(name="content_builder_warmup")
+
 # --- Escalation Checker ---
 
 class EscalationChecker(BaseAgent):
@@ -81,15 +112,10 @@ class EscalationChecker(BaseAgent):
     ) -> AsyncGenerator[Event, None]:
         # Retrieve the feedback saved by the Judge
         feedback = ctx.session.state.get("judge_feedback")
-        print(f"[EscalationChecker] Feedback: {feedback}")
+        logger.debug("[EscalationChecker] Feedback: %s", feedback)
 
-        # Check for 'pass' status
-        is_pass = False
-        if isinstance(feedback, dict) and feedback.get("status") == "pass":
-            is_pass = True
-        # Handle string fallback if JSON parsing failed
-        elif isinstance(feedback, str) and '"status": "pass"' in feedback:
-            is_pass = True
+        # Check for 'pass' status; unparseable feedback is kept as text and fails
+        is_pass = isinstance(feedback, dict) and feedback.get("status") == "pass"
 
         if is_pass:
             # 'escalate=True' tells the parent LoopAgent to stop looping
@@ -114,6 +140,6 @@ research_loop = LoopAgent(
 root_agent = SequentialAgent(
     name="gemini_tales_pipeline",
     description="A pipeline that creates interactive movement-based stories for kids.",
-    sub_agents=[research_loop, content_builder],
+    sub_agents=[content_builder_warmup, research_loop, content_builder],
 )
 
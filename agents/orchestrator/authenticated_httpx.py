@@ -1,26 +1,109 @@
 
+import asyncio
 import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 from google.adk.agents.remote_a2a_agent import DEFAULT_TIMEOUT
-from google.auth.transport.requests import AuthorizedSession, Request
-from google.auth.exceptions import DefaultCredentialsError
+import google.auth
+from google.auth import jwt
+from google.auth.transport.requests import Request
+from google.auth.exceptions import DefaultCredentialsError, RefreshError
 from google.oauth2.credentials import Credentials
 from google.oauth2.id_token import fetch_id_token_credentials
 import httpx
 
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=512,
+    max_keepalive_connections=256,
+    keepalive_expiry=90,
+)
+
+# Identity tokens by audience, shared by every client in the process
+_id_tokens: Dict[str, Tuple[str, float]] = {}
+# One lock per audience, so fetching a token for one service never waits on another
+_id_token_locks: Dict[str, threading.Lock] = {}
+TOKEN_REFRESH_MARGIN = 60.0
+
+def _cached_id_token(audience: str) -> Optional[str]:
+    cached = _id_tokens.get(audience)
+    if cached and cached[1] - time.time() > TOKEN_REFRESH_MARGIN:
+        return cached[0]
+    return None
+
+def _fetch_id_token(audience: str) -> Optional[str]:
+    # Cloud Run / GCE, or a service account key: Compute Metadata server or key file
+    try:
+        credentials = fetch_id_token_credentials(audience=audience)
+        credentials.refresh(Request())
+        return credentials.token
+    except DefaultCredentialsError:
+        pass
+    # Local run: refreshing the user's Application Default Credentials
+    # also returns an identity token, without forking gcloud
+    try:
+        credentials, _ = google.auth.default()
+        if isinstance(credentials, Credentials):
+            credentials.refresh(Request())
+            if credentials.id_token:
+                return credentials.id_token
+    except (DefaultCredentialsError, RefreshError):
+        pass
+    # Last resort: the authenticated gcloud CLI user
+    try:
+        id_token = subprocess.check_output(
+            [
+                "gcloud.cmd",
+                "auth",
+                "print-identity-token",
+                "-q"
+            ]
+        ).decode().strip()
+        return id_token or None
+    except (subprocess.SubprocessError, OSError):
+        print("ERROR: Unable to fetch identity token.")
+        return None
+
+def _get_id_token(audience: str) -> Optional[str]:
+    """Returns a cached identity token for the audience, fetching a new one
+    when it is missing or expires within TOKEN_REFRESH_MARGIN seconds.
+    Blocking: may call the metadata server or the gcloud CLI."""
+    with _id_token_locks.setdefault(audience, threading.Lock()):
+        id_token = _cached_id_token(audience)
+        if id_token:
+            return id_token
+        id_token = _fetch_id_token(audience)
+        if id_token:
+            # A token without a readable expiry is still used, just not cached
+            try:
+                expiry = float(jwt.decode(id_token, verify=False)["exp"])
+            except (ValueError, KeyError, TypeError):
+                return id_token
+            _id_tokens[audience] = (id_token, expiry)
+        return id_token
+
 def create_authenticated_client(
         remote_service_url: str,
-        timeout: float = DEFAULT_TIMEOUT
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: bool = True,
+        limits: Optional[httpx.Limits] = None
     ) -> httpx.AsyncClient:
     """Creates an httpx.AsyncClient with Google identity token authentication.
     Identity tokens are obtained:
       - If running in Cloud, from Compute Metadata server
-      - If running locally, from gcloud CLI
+      - If running locally, from Application Default Credentials
+      - As a last resort, from gcloud CLI
+    Tokens are cached per audience for the whole process.
 
     Args:
         remote_service_url (str): URL of the service to authenticate requests to.
         timeout (float, optional): Request timeout. Defaults to DEFAULT_TIMEOUT.
+        http2 (bool, optional): Negotiate HTTP/2 on TLS connections so
+            concurrent requests share one connection. Defaults to True.
+        limits (httpx.Limits, optional): Connection pool limits. Defaults to
+            DEFAULT_LIMITS.
 
     Returns:
         httpx.AsyncClient: httpx Client with Google identity token authentication.
@@ -30,61 +113,83 @@ def create_authenticated_client(
         def __init__(self, remote_service_url: str):
             parsed_url = urlparse(remote_service_url)
             self.root_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            self.session = None
 
         def auth_flow(self, request):
-            if self.session:
-                id_token = self.session.credentials.token
-            else:
-                id_token = None
-                try:
-                    credentials = fetch_id_token_credentials(
-                        audience=self.root_url,
-                    )
-                    credentials.refresh(Request())
-                    self.session = AuthorizedSession(
-                        credentials
-                    )
-                    id_token = self.session.credentials.token
-                except DefaultCredentialsError:
-                    self.outside_cloud = True
-                if not id_token:
-                    # Local run, fetching authenticated user's identity token
-                    # from gcloud CLI
-                    try:
-                        id_token = subprocess.check_output(
-                            [
-                                "gcloud.cmd",
-                                "auth",
-                                "print-identity-token",
-                                "-q"
-                            ]
-                        ).decode().strip()
-                        if id_token:
-                            refresh_token = subprocess.check_output(
-                                [
-                                    "gcloud.cmd",
-                                    "auth",
-                                    "print-refresh-token",
-                                    "-q"
-                                ]
-                            ).decode().strip()
-                            credentials = Credentials(
-                                token=id_token,
-                                id_token=id_token,
-                                refresh_token=refresh_token
-                            )
-                            self.session = AuthorizedSession(
-                                credentials
-                            )
-                    except subprocess.SubprocessError:
-                        print("ERROR: Unable to fetch identity token.")
+            id_token = _get_id_token(self.root_url)
+            if id_token:
+                request.headers["Authorization"] = f"Bearer {id_token}"
+            yield request
+
+        async def async_auth_flow(self, request):
+            # Reuse the cached token on the event loop; only fetching a new
+            # one is pushed to a worker thread
+            id_token = _cached_id_token(self.root_url)
+            if not id_token:
+                id_token = await asyncio.to_thread(_get_id_token, self.root_url)
             if id_token:
                 request.headers["Authorization"] = f"Bearer {id_token}"
             yield request
 
+    limits = limits or DEFAULT_LIMITS
     return httpx.AsyncClient(
         auth=_IdentityTokenAuth(remote_service_url),
         follow_redirects=True,
         timeout=timeout,
+        # Keep-alive pool (never disabled) for every transport, proxies included
+        http2=http2,
+        limits=limits,
+        # Retries for failed connects. Mounted rather than passed as transport=,
+        # which would make httpx ignore HTTP(S)_PROXY/NO_PROXY; proxy mounts from
+        # the environment still take precedence over this catch-all one
+        mounts={
+            "all://": httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=limits,
+                retries=2,
+            ),
+        },
     )
+
+
+# Clients by origin, so every caller targeting the same host shares one pool
+_client_registry: Dict[str, httpx.AsyncClient] = {}
+
+def get_or_create_authenticated_client(
+        remote_service_url: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: bool = True,
+        limits: Optional[httpx.Limits] = None
+    ) -> httpx.AsyncClient:
+    """Returns the shared authenticated client for the URL's origin, creating
+    it with create_authenticated_client on first use. Options only apply when
+    the client is created; later callers get the existing client as-is.
+
+    Args:
+        remote_service_url (str): URL of the service to authenticate requests to.
+        timeout (float, optional): Request timeout. Defaults to DEFAULT_TIMEOUT.
+        http2 (bool, optional): Negotiate HTTP/2 on TLS connections. Defaults to True.
+        limits (httpx.Limits, optional): Connection pool limits. Defaults to
+            DEFAULT_LIMITS.
+
+    Returns:
+        httpx.AsyncClient: Shared httpx Client for the origin.
+    """
+    parsed_url = urlparse(remote_service_url)
+    origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    client = _client_registry.get(origin)
+    if client is None or client.is_closed:
+        client = create_authenticated_client(
+            remote_service_url,
+            timeout=timeout,
+            http2=http2,
+            limits=limits,
+        )
+        _client_registry[origin] = client
+    return client
+
+
+async def aclose_authenticated_clients() -> None:
+    """Closes and forgets every client created by get_or_create_authenticated_client."""
+    clients = list(_client_registry.values())
+    _client_registry.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
@@ -1,21 +1,16 @@
 import sys
 import os
-from dotenv import load_dotenv
 from google.genai import types
 from google.adk.agents import Agent
 from google.adk.planners import BuiltInPlanner
 from google.adk.tools.google_search_tool import google_search
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-from shared.config import STRICT_SAFETY
+from shared.config import STRICT_SAFETY, compact_instruction, get_env
 
-load_dotenv()
+MODEL = get_env("MODEL_NAME_FLASH", "gemini-2.5-flash")
 
-MODEL = os.getenv("MODEL_NAME_FLASH", "gemini-2.5-flash")
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
-
-researcher_instruction = """
+researcher_instruction = compact_instruction("""
     # Your Identity
     You are the 'Adventure Seeker' for Gemini Tales, a world-class scout with expertise in child pedagogy and interactive outdoor exploration. 
 
@@ -49,7 +44,7 @@ researcher_instruction = """
     **When research is called 'too passive':** 
     User: "Feedback: This is just facts. Add movement." 
     You: "I will refine the search. I found that ancient Egyptians used boats on the Nile. **Magic Task:** Sit on the floor and pretend to row a big wooden boat for 20 seconds! Pull those oars hard!"
-    """
+    """)
 
 # Define the Researcher Agent
 researcher = Agent(
@@ -58,7 +53,7 @@ researcher = Agent(
     planner=BuiltInPlanner(
         thinking_config=types.ThinkingConfig(
             include_thoughts=True, 
-            thinking_budget=1024 
+            thinking_budget=512
         )
     ),
     description="Gathers fairy-tale lore and physical activity ideas for children.",
@@ -3,6 +3,7 @@ const topicInput = document.getElementById('topic-input');
 const createButton = document.getElementById('create-button');
 const progressContainer = document.getElementById('progress-container');
 const statusText = document.getElementById('status-text');
+const storyPreview = document.getElementById('story-preview');
 
 // Generate a random session ID for this browser session
 const sessionId = 'session-' + Math.random().toString(36).substring(2, 15);
@@ -56,6 +57,7 @@ createForm.addEventListener('submit', async (e) => {
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
         let buffer = '';
+        let storyText = '';
 
         while (true) {
             const { value, done } = await reader.read();
@@ -66,14 +68,21 @@ createForm.addEventListener('submit', async (e) => {
             buffer = lines.pop();
 
             for (const line of lines) {
-                if (!line.trim()) continue;
+                // Server-Sent Events: skip keep-alive comments and blank separators
+                if (!line.startsWith('data:')) continue;
                 try {
-                    const data = JSON.parse(line);
+                    const data = JSON.parse(line.slice(5));
                     if (data.type === 'progress') {
                         updateStatus(data.text);
-                    } else if (data.type === 'result') {
+                    } else if (data.type === 'delta') {
+                        // Story text arrives as it is written, so show it right away
+                        storyText += data.text;
+                        storyPreview.textContent = storyText;
+                        storyPreview.classList.remove('hidden');
+                        storyPreview.scrollTop = storyPreview.scrollHeight;
+                    } else if (data.type === 'end') {
                         // Save result and redirect
-                        localStorage.setItem('currentCourse', data.text);
+                        localStorage.setItem('currentCourse', storyText.trim());
                         localStorage.setItem('renderedContent', data.rendered_content || '');
                         window.location.href = '/story.html';
                         return;
@@ -138,6 +138,7 @@ class GeminiLiveAPI {
     this.functionsMap = {};
     this.previousImage = null;
     this.totalBytesSent = 0;
+    this.textDecoder = new TextDecoder();
 
     // Automatic activity detection settings with defaults
     this.automaticActivityDetection = {
@@ -249,7 +250,12 @@ class GeminiLiveAPI {
 
   onReceiveMessage(messageEvent) {
     console.log("Message received: ", messageEvent);
-    const messageData = JSON.parse(messageEvent.data);
+    // The proxy forwards Gemini's binary JSON frames without re-encoding them
+    const rawData =
+      typeof messageEvent.data === "string"
+        ? messageEvent.data
+        : this.textDecoder.decode(messageEvent.data);
+    const messageData = JSON.parse(rawData);
     const message = new MultimodalLiveResponseMessage(messageData);
     this.onReceiveResponse(message);
   }
@@ -258,6 +264,7 @@ class GeminiLiveAPI {
     console.log("connecting: ", this.proxyUrl);
 
     this.webSocket = new WebSocket(this.proxyUrl);
+    this.webSocket.binaryType = "arraybuffer";
 
     this.webSocket.onclose = (event) => {
       console.log("websocket closed: ", event);
@@ -1,28 +1,25 @@
 import logging
 import os
-import json
 import asyncio
-import ssl
-import certifi
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 import google.auth
 from google.auth.transport.requests import Request
-import websockets
 from dotenv import load_dotenv
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
-from httpx_sse import aconnect_sse
+import orjson
 
 from fastapi import FastAPI, WebSocket
-from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from opentelemetry import trace
-from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
-from opentelemetry.sdk.trace import TracerProvider, export
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
-from authenticated_httpx import create_authenticated_client
+from authenticated_httpx import aclose_authenticated_clients, get_or_create_authenticated_client
 
 load_dotenv()
 
@@ -35,37 +32,102 @@ class Feedback(BaseModel):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-provider = TracerProvider()
-processor = export.BatchSpanProcessor(
-    CloudTraceSpanExporter(),
-)
-provider.add_span_processor(processor)
-trace.set_tracer_provider(provider)
+def _init_tracing():
+    """Configures Cloud Trace export. Imported here to keep worker boot light."""
+    from opentelemetry import trace
+    from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
+    from opentelemetry.sdk.trace import TracerProvider, export
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    # Head-based sampling keeps Cloud Trace export off the hot path
+    sample_ratio = float(os.getenv("OTEL_TRACES_SAMPLER_ARG", "0.1"))
+    provider = TracerProvider(sampler=ParentBased(TraceIdRatioBased(sample_ratio)))
+    processor = export.BatchSpanProcessor(
+        CloudTraceSpanExporter(),
+        max_queue_size=2048,
+        max_export_batch_size=256,
+        schedule_delay_millis=5000,
+    )
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+    return provider
+
+STARTUP_WARMUP_TIMEOUT = 5.0
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tracer_provider = _init_tracing()
+    # Listing apps at boot resolves the agent name and warms the ADK connection
+    # and identity token, so the first chat request pays for neither
+    # Warming up is best-effort: a slow or failing ADK server or token fetch
+    # must not hold up or crash startup
+    try:
+        async with asyncio.timeout(STARTUP_WARMUP_TIMEOUT):
+            agent_list = await list_agents(agent_server_url) # type: ignore
+    except Exception as e:
+        logger.warning(f"Could not list agents at startup, will retry on first request: {e!r}")
+        agent_list = []
+    app.state.agent_name = os.getenv("AGENT_NAME") or (agent_list[0] if agent_list else None)
+    yield
+    await aclose_authenticated_clients()
+    tracer_provider.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# The frontends are served from this app, so CORS only matters for other origins.
+# Without an explicit list any origin may call the API, but without credentials;
+# cookies and auth headers are only allowed for the listed origins.
+allowed_origins = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=allowed_origins or ["*"],
+    allow_credentials=bool(allowed_origins),
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-agent_name = os.getenv("AGENT_NAME", None)
 agent_server_url = os.getenv("AGENT_SERVER_URL")
 if not agent_server_url:
     raise ValueError("AGENT_SERVER_URL environment variable not set")
 else:
     agent_server_url = agent_server_url.rstrip("/")
 
-clients: Dict[str, httpx.AsyncClient] = {}
+# HTTP/2 lets concurrent /run_sse streams share one TLS connection; set
+# AGENT_SERVER_HTTP2=false if the ADK server sits behind an HTTP/1.1-only proxy
+agent_server_http2 = os.getenv("AGENT_SERVER_HTTP2", "true").lower() != "false"
+AGENT_SERVER_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
 
 async def get_client(agent_server_origin: str) -> httpx.AsyncClient:
-    global clients
-    if agent_server_origin not in clients:
-        clients[agent_server_origin] = create_authenticated_client(agent_server_origin)
-    return clients[agent_server_origin]
+    """Returns the process-wide shared client for an origin."""
+    return get_or_create_authenticated_client(
+        agent_server_origin,
+        http2=agent_server_http2,
+        limits=AGENT_SERVER_LIMITS,
+    )
+
+# Agent lists rarely change between chat requests, so they are cached briefly
+# to skip an ADK round-trip on the hot path
+AGENT_LIST_TTL = 60.0
+_agent_list_cache: Dict[str, Tuple[List[str], float]] = {}
+
+# ADK session ids by the client's own session id, so a returning chat request
+# skips the session lookup. Only ids are kept, and the least recently used entry
+# is evicted past SESSION_CACHE_MAX
+SESSION_CACHE_MAX = 1024
+_session_ids: "OrderedDict[Tuple[str, str, str, str], str]" = OrderedDict()
+
+def _cached_session_id(key: Tuple[str, str, str, str]) -> Optional[str]:
+    session_id = _session_ids.get(key)
+    if session_id is not None:
+        _session_ids.move_to_end(key)
+    return session_id
+
+def _cache_session_id(key: Tuple[str, str, str, str], session_id: str) -> None:
+    _session_ids[key] = session_id
+    _session_ids.move_to_end(key)
+    if len(_session_ids) > SESSION_CACHE_MAX:
+        _session_ids.popitem(last=False)
 
 async def create_session(agent_server_origin: str, agent_name: str, user_id: str) -> Dict[str, Any]:
     httpx_client = await get_client(agent_server_origin)
@@ -78,7 +140,7 @@ async def create_session(agent_server_origin: str, agent_name: str, user_id: str
         headers=headers
     )
     session_response.raise_for_status()
-    return session_response.json()
+    return orjson.loads(session_response.content)
 
 async def get_session(agent_server_origin: str, agent_name: str, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
     httpx_client = await get_client(agent_server_origin)
@@ -93,10 +155,13 @@ async def get_session(agent_server_origin: str, agent_name: str, user_id: str, s
     if session_response.status_code == 404:
         return None
     session_response.raise_for_status()
-    return session_response.json()
+    return orjson.loads(session_response.content)
 
 
 async def list_agents(agent_server_origin: str) -> List[str]:
+    cached = _agent_list_cache.get(agent_server_origin)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
     httpx_client = await get_client(agent_server_origin)
     headers=[
         ("Content-Type", "application/json")
@@ -107,15 +172,19 @@ async def list_agents(agent_server_origin: str) -> List[str]:
         headers=headers
     )
     list_response.raise_for_status()
-    agent_list = list_response.json()
+    agent_list = orjson.loads(list_response.content)
     if not agent_list:
         agent_list = ["agent"]
+    _agent_list_cache[agent_server_origin] = (agent_list, time.monotonic() + AGENT_LIST_TTL)
     return agent_list
 
 
 async def query_adk_sever(
-        agent_server_origin: str, agent_name: str, user_id: str, message: str, session_id
+        agent_server_origin: str, agent_name: str, user_id: str, message: str, session_id,
+        session_key: Optional[Tuple[str, str, str, str]] = None
 ) -> AsyncGenerator[Dict[str, Any], None]:
+    from httpx_sse import aconnect_sse
+
     httpx_client = await get_client(agent_server_origin)
     request = {
         "appName": agent_name,
@@ -125,149 +194,316 @@ async def query_adk_sever(
             "role": "user",
             "parts": [{"text": message}]
         },
-        "streaming": False
+        # Partial events let story text reach the browser while it is written
+        "streaming": True
     }
-    async with aconnect_sse(
-        httpx_client,
-        "POST",
-        f"{agent_server_origin}/run_sse",
-        json=request
-    ) as event_source:
-        if event_source.response.is_error:
-            event = {
-                "author": agent_name,
-                "content":{
-                    "parts": [
-                        {
-                            "text": f"Error {event_source.response.text}"
-                        }
-                    ]
+    # A cached session id may be gone on the ADK side (sessions live in memory
+    # there, so a restart drops them); retry once with a new session then
+    for attempt in range(2):
+        async with aconnect_sse(
+            httpx_client,
+            "POST",
+            f"{agent_server_origin}/run_sse",
+            json=request
+        ) as event_source:
+            response = event_source.response
+            if response.status_code == 404 and attempt == 0:
+                await response.aread()
+                session = await create_session(agent_server_origin, agent_name, user_id)
+                request["sessionId"] = session["id"]
+                if session_key:
+                    _cache_session_id(session_key, session["id"])
+                continue
+            if response.is_error:
+                # Streamed responses must be read before their body is available
+                await response.aread()
+                event = {
+                    "author": agent_name,
+                    "content":{
+                        "parts": [
+                            {
+                                "text": f"Error {response.text}"
+                            }
+                        ]
+                    }
                 }
-            }
-            yield event
-        else:
-            async for server_event in event_source.aiter_sse():
-                event = server_event.json()
                 yield event
+            else:
+                async for server_event in event_source.aiter_sse():
+                    event = orjson.loads(server_event.data)
+                    yield event
+            return
 
 class SimpleChatRequest(BaseModel):
     message: str
     user_id: str = "test_user"
     session_id: Optional[str] = None
 
+RC_KEYS = ("rendered_content", "renderedContent")
+GM_KEYS = ("grounding_metadata", "groundingMetadata")
+SEP_KEYS = ("search_entry_point", "searchEntryPoint")
+# Remote agents' events carry the A2A task or message they were converted from,
+# with the remote event's grounding metadata in its ADK metadata
+A2A_RESPONSE_KEY = "a2a:response"
+A2A_GM_KEY = "adk_grounding_metadata"
+
+def _rendered_content_in_grounding(gm: Dict[str, Any]) -> Optional[str]:
+    """Reads rendered content from grounding metadata or its search entry point."""
+    for key in RC_KEYS:
+        if rc := gm.get(key):
+            return rc
+    for sep_key in SEP_KEYS:
+        sep = gm.get(sep_key)
+        if sep:
+            for key in RC_KEYS:
+                if rc := sep.get(key):
+                    return rc
+    return None
+
+def _rendered_content_at(data: Dict[str, Any]) -> Optional[str]:
+    """Checks an event or content part and its grounding metadata."""
+    for key in RC_KEYS:
+        if rc := data.get(key):
+            return rc
+    for gm_key in GM_KEYS:
+        gm = data.get(gm_key)
+        if gm and (rc := _rendered_content_in_grounding(gm)):
+            return rc
+    return None
+
+def extract_google_html(event: Dict[str, Any]) -> Optional[str]:
+    """Finds Google Search rendered content in an ADK event.
+
+    Only the locations ADK uses are checked: the event itself and its content
+    parts for local agents, and the A2A response in the custom metadata for
+    remote agents, which is where the orchestrator's researcher events keep it.
+    """
+    if rc := _rendered_content_at(event):
+        return rc
+    content = event.get("content")
+    if content:
+        for part in content.get("parts") or ():
+            if rc := _rendered_content_at(part):
+                return rc
+    custom_metadata = event.get("customMetadata") or event.get("custom_metadata")
+    response = custom_metadata and custom_metadata.get(A2A_RESPONSE_KEY)
+    if type(response) is dict:
+        # Task updates merge their metadata into the task; a status message may carry its own
+        status_message = (response.get("status") or {}).get("message") or {}
+        for metadata in (response.get("metadata"), status_message.get("metadata")):
+            gm = metadata and metadata.get(A2A_GM_KEY)
+            if type(gm) is dict and (rc := _rendered_content_in_grounding(gm)):
+                return rc
+    return None
+
+# Only these authors contribute to the story; JSON-looking text is judge noise
+STORY_AUTHORS = frozenset({"content_builder", "gemini_tales_pipeline"})
+TECHNICAL_PREFIXES = ("{", "---{")
+
+def sse_frame(payload: Dict[str, Any]) -> bytes:
+    """Encodes a payload as a complete Server-Sent Events frame."""
+    return b"data: " + orjson.dumps(payload) + b"\r\n\r\n"
+
+# Progress frames never change, so they are encoded once at import time
+PROGRESS_SEARCH_SOURCES = sse_frame({"type": "progress", "text": "🔍 Google Search sources found..."})
+PROGRESS_RESEARCHER = sse_frame({"type": "progress", "text": "🔍 Adventure Seeker is scouting..."})
+PROGRESS_JUDGE = sse_frame({"type": "progress", "text": "⚖️ Guardian is checking safety..."})
+PROGRESS_CONTENT_BUILDER = sse_frame({"type": "progress", "text": "✍️ Storysmith is writing..."})
+PROGRESS_MSGS = {
+    "researcher": PROGRESS_RESEARCHER,
+    "judge": PROGRESS_JUDGE,
+    "content_builder": PROGRESS_CONTENT_BUILDER,
+}
+
+# Enough of a message's opening to tell story text from technical noise
+STORY_HEAD_CHARS = 64
+
+def _is_technical(opening: str) -> bool:
+    """Judge JSON and internal feedback that must not reach the story."""
+    return opening.lstrip().startswith(TECHNICAL_PREFIXES) or "Feedback:" in opening
+
+async def stream_story(events: AsyncIterator[Dict[str, Any]]) -> AsyncGenerator[bytes, None]:
+    """Turns ADK events into progress, story delta and end frames.
+
+    Story text is filtered per message, not per chunk: the opening of each story
+    author's message is held back until it decides whether the whole message is
+    story or technical noise, so streamed messages filter like whole ones.
+    """
+    story_started = False
+    rendered_content = None
+    progress_author = None
+    # Authors whose current message already went out as partial chunks
+    streamed_authors = set()
+    # Per author: the opening of the current message while it is undecided,
+    # then whether that message is story text
+    openings: Dict[str, List[str]] = {}
+    is_story: Dict[str, bool] = {}
+
+    def story_delta(text: str) -> Optional[bytes]:
+        nonlocal story_started
+        if not story_started:
+            text = text.lstrip()
+            if not text:
+                return None
+            story_started = True
+        return sse_frame({"type": "delta", "text": text})
+
+    def end_message(author: str) -> Optional[bytes]:
+        # A short message never filled its opening; decide on what there is
+        opening = "".join(openings.pop(author, ()))
+        is_story.pop(author, None)
+        if opening and not _is_technical(opening):
+            return story_delta(opening)
+        return None
+
+    async for event in events:
+        author = event.get("author")
+
+        # 1. Search for rendered_content exactly where ADK puts it (once per stream)
+        if rendered_content is None and (rc := extract_google_html(event)):
+            rendered_content = rc
+            logger.info(f"Found google search html from {author}")
+            yield PROGRESS_SEARCH_SOURCES
+
+        # 2. Progress updates, only when a different agent takes over
+        if author != progress_author:
+            progress = PROGRESS_MSGS.get(author)
+            if progress:
+                progress_author = author
+                yield progress
+
+        # 3. Stream story text but STRICTLY FILTER OUT thoughts and technical noise
+        # Only take text from the Storysmith or Orchestrator to keep clean story;
+        # other authors are skipped before any per-part string work
+        content = event.get("content")
+        if not (content and author in STORY_AUTHORS):
+            continue
+        partial = event.get("partial")
+        # With streaming on, a message arrives as partial chunks followed by
+        # one aggregated event repeating the whole text; that repeat ends it
+        if not partial and author in streamed_authors:
+            streamed_authors.discard(author)
+            if frame := end_message(author):
+                yield frame
+            continue
+        if partial:
+            streamed_authors.add(author)
+        for part in content.get("parts", []):
+            # BLOCK thoughts (this removes the "AI brain" chatter)
+            if part.get("thought") == True:
+                continue
+            text = part.get("text")
+            if not text:
+                continue
+            if author not in is_story:
+                opening = openings.setdefault(author, [])
+                opening.append(text)
+                text = "".join(opening)
+                if len(text.lstrip()) < STORY_HEAD_CHARS:
+                    continue
+                del openings[author]
+                is_story[author] = not _is_technical(text)
+            if is_story[author] and (frame := story_delta(text)):
+                yield frame
+        if not partial:
+            # A whole message ends with its own event
+            if frame := end_message(author):
+                yield frame
+
+    # Streams cut off before their aggregated event still flush their opening
+    for author in list(openings):
+        if frame := end_message(author):
+            yield frame
+
+    # Final safety check for text
+    if not story_started:
+        yield sse_frame({"type": "delta", "text": "The story is taking shape..."})
+
+    # Close the stream with the search sources
+    yield sse_frame({"type": "end", "rendered_content": rendered_content})
+
 @app.post("/api/chat_stream")
 async def chat_stream(request: SimpleChatRequest):
     """Streaming chat endpoint."""
-    global agent_name, agent_server_url
+    agent_name = app.state.agent_name
     if not agent_name:
-        agent_name = (await list_agents(agent_server_url))[0] # type: ignore
+        agent_name = app.state.agent_name = (await list_agents(agent_server_url))[0] # type: ignore
 
-    session = None
+    session_key = None
+    session_id = None
     if request.session_id:
-        session = await get_session(
-            agent_server_url, # type: ignore
-            agent_name,
-            request.user_id,
-            request.session_id
-        )
-    if session is None:
+        session_key = (agent_server_url, agent_name, request.user_id, request.session_id)
+        session_id = _cached_session_id(session_key) # type: ignore
+        if session_id is None:
+            session = await get_session(
+                agent_server_url, # type: ignore
+                agent_name,
+                request.user_id,
+                request.session_id
+            )
+            if session is not None:
+                session_id = session["id"]
+    if session_id is None:
         session = await create_session(
             agent_server_url, # type: ignore
             agent_name,
             request.user_id
         )
+        session_id = session["id"]
+    if session_key:
+        _cache_session_id(session_key, session_id) # type: ignore
 
     events = query_adk_sever(
         agent_server_url, # type: ignore
         agent_name,
         request.user_id,
         request.message,
-        session["id"]
+        session_id,
+        session_key # type: ignore
     )
 
-    async def event_generator():
-        final_text = ""
-        rendered_content = None
-        async for event in events:
-            author = event.get("author")
-            
-            # 1. Search for rendered_content exactly where ADK puts it
-            # It can be in grounding_metadata or a top-level field in some event types
-            def extract_google_html(data):
-                if not isinstance(data, dict): return None
-                # Check direct fields
-                for key in ["rendered_content", "renderedContent"]:
-                    if data.get(key): return data.get(key)
-                # Check grounding_metadata
-                gm = data.get("grounding_metadata") or data.get("groundingMetadata")
-                if isinstance(gm, dict):
-                    rc = gm.get("rendered_content") or gm.get("renderedContent")
-                    if rc: return rc
-                # Recursive search for deeper nesting
-                for v in data.values():
-                    if isinstance(v, dict):
-                        res = extract_google_html(v)
-                        if res: return res
-                return None
-
-            rc = extract_google_html(event)
-            if rc and not rendered_content:
-                rendered_content = rc
-                logger.info(f"Found google search html from {author}")
-                yield json.dumps({"type": "progress", "text": "🔍 Google Search sources found..."}) + "\n"
-
-            # 2. Progress updates
-            if author == "researcher":
-                 yield json.dumps({"type": "progress", "text": "🔍 Adventure Seeker is scouting..."}) + "\n"
-            elif author == "judge":
-                 yield json.dumps({"type": "progress", "text": "⚖️ Guardian is checking safety..."}) + "\n"
-            elif author == "content_builder":
-                 yield json.dumps({"type": "progress", "text": "✍️ Storysmith is writing..."}) + "\n"
-            
-            # 3. Accumulate text but STRICTLY FILTER OUT thoughts and technical noise
-            if "content" in event and event["content"]:
-                parts = event["content"].get("parts", [])
-                for part in parts:
-                    # BLOCK thoughts (this removes the "AI brain" chatter)
-                    if part.get("thought") == True:
-                        continue
-                    
-                    text = part.get("text")
-                    if text:
-                        # Filter out Judge's JSON and internal feedback
-                        is_technical = text.strip().startswith("{") or text.strip().startswith("---{") or "Feedback:" in text
-                        if not is_technical:
-                            # Only take text from the Storysmith or Orchestrator to keep clean story
-                            if author in ["content_builder", "gemini_tales_pipeline"]:
-                                final_text += text
-        
-        # Final safety check for text
-        if not final_text.strip():
-            final_text = "The story is taking shape..."
-
-        # Send final result
-        yield json.dumps({"type": "result", "text": final_text.strip(), "rendered_content": rendered_content}) + "\n"
-
-    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+    # Keep-alive pings stop proxies from dropping the stream during long agent steps
+    return EventSourceResponse(
+        stream_story(events),
+        ping=15,
+        headers={"X-Accel-Buffering": "no"},
+    )
 
 # GEMINI LIVE API WEBSOCKET PROXY
+_gcp_credentials = None
+_gcp_credentials_lock = threading.Lock()
+
 def generate_gcp_token():
-    """Retrieves an access token using Google Cloud default credentials."""
+    """Retrieves an access token using Google Cloud default credentials.
+
+    Credentials are cached for the life of the process and only refreshed when
+    the token is expired or about to expire.
+    """
+    global _gcp_credentials
     try:
-        creds, _ = google.auth.default()
-        if not creds.valid:
-            creds.refresh(Request())
-        return creds.token
+        with _gcp_credentials_lock:
+            if _gcp_credentials is None:
+                _gcp_credentials, _ = google.auth.default()
+            if not _gcp_credentials.valid:
+                _gcp_credentials.refresh(Request())
+            return _gcp_credentials.token
     except Exception as e:
         logger.error(f"Error generating access token: {e}")
         return None
 
+class _PumpClosed(Exception):
+    """Raised by a proxy pump when its side of the connection is done."""
+
 @app.websocket("/ws/proxy")
 async def gemini_live_proxy(websocket: WebSocket):
     """
     WebSocket proxy for Gemini Live API.
     Extracts Project ID and Model from the query string and connects to Google Cloud.
     """
+    import ssl
+    import certifi
+    import websockets
+
     await websocket.accept()
     logger.info("🔌 New WebSocket client connected to proxy")
     
@@ -285,7 +521,7 @@ async def gemini_live_proxy(websocket: WebSocket):
 
         service_url = "wss://us-central1-aiplatform.googleapis.com/ws/google.cloud.aiplatform.v1beta1.LlmBidiService/BidiGenerateContent"
 
-        bearer_token = generate_gcp_token()
+        bearer_token = await asyncio.to_thread(generate_gcp_token)
         if not bearer_token:
             logger.error("❌ Failed to generate Google Cloud credentials")
             await websocket.close(code=1008, reason="Authentication failed on server")
@@ -310,6 +546,8 @@ async def gemini_live_proxy(websocket: WebSocket):
                 try:
                     while True:
                         message = await websocket.receive()
+                        if message["type"] == "websocket.disconnect":
+                            break
                         if "text" in message:
                             text_data = message["text"]
                             if '"service_url"' in text_data:
@@ -324,36 +562,31 @@ async def gemini_live_proxy(websocket: WebSocket):
                             await server_websocket.send(message["bytes"])
                 except Exception as e:
                     logger.error(f"❌ C->S error: {e}")
+                raise _PumpClosed()
 
             # Channel: Google -> Browser
             async def server_to_client():
                 try:
                     async for message in server_websocket:
+                        # Forward frames as-is; the browser decodes binary JSON frames itself
                         if isinstance(message, bytes):
-                            try:
-                                decoded_msg = message.decode('utf-8')
-                                logger.info(f"⬅️ FROM GOOGLE (decoded): {decoded_msg[:500]}")
-                                await websocket.send_text(decoded_msg)
-                            except UnicodeDecodeError:
-                                logger.info(f"⬅️ FROM GOOGLE (binary data, len: {len(message)})")
-                                await websocket.send_bytes(message)
+                            logger.debug(f"⬅️ FROM GOOGLE (binary, len: {len(message)})")
+                            await websocket.send_bytes(message)
                         else:
-                            logger.info(f"⬅️ FROM GOOGLE (text): {message[:500]}")
+                            logger.debug(f"⬅️ FROM GOOGLE (text, len: {len(message)})")
                             await websocket.send_text(message)
                 except Exception as e:
                     logger.error(f"❌ S->C error: {e}")
+                raise _PumpClosed()
 
-            pump_tasks = [
-                asyncio.create_task(client_to_server()),
-                asyncio.create_task(server_to_client())
-            ]
-            
-            done, pending = await asyncio.wait(
-                pump_tasks, return_when=asyncio.FIRST_COMPLETED
-            )
-            
-            for task in pending:
-                task.cancel()
+            # Whichever pump finishes first cancels its sibling; the group
+            # awaits both before the sockets are closed
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(client_to_server())
+                    tg.create_task(server_to_client())
+            except* _PumpClosed:
+                pass
 
     except Exception as e:
         logger.error(f"Proxy error: {e}")
@@ -0,0 +1,41 @@
+import json
+import os
+from pathlib import Path
+
+os.environ.setdefault("AGENT_SERVER_URL", "http://localhost:8000")
+
+from main import extract_google_html
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_remote_researcher_event():
+    # A researcher event as the orchestrator's /run_sse sends it: the grounding
+    # metadata only survives the A2A hop inside the task's ADK metadata
+    event = json.loads((FIXTURES / "researcher_a2a_event.json").read_text())
+    assert extract_google_html(event).startswith("<style>")
+
+
+def test_status_message_metadata():
+    event = {"customMetadata": {"a2a:response": {"status": {"message": {"metadata": {
+        "adk_grounding_metadata": {"searchEntryPoint": {"renderedContent": "<html>"}}
+    }}}}}}
+    assert extract_google_html(event) == "<html>"
+
+
+def test_local_event():
+    event = {"groundingMetadata": {"searchEntryPoint": {"renderedContent": "<html>"}}}
+    assert extract_google_html(event) == "<html>"
+
+
+def test_content_part():
+    event = {"content": {"parts": [
+        {"text": "story"},
+        {"grounding_metadata": {"search_entry_point": {"rendered_content": "<html>"}}},
+    ]}}
+    assert extract_google_html(event) == "<html>"
+
+
+def test_event_without_grounding():
+    event = {"author": "judge", "content": {"parts": [{"text": "{\"status\": \"pass\"}"}]}}
+    assert extract_google_html(event) is None
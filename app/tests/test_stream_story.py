@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import orjson
+
+os.environ.setdefault("AGENT_SERVER_URL", "http://localhost:8000")
+
+from main import stream_story
+
+STORY = (
+    "Once upon a time, in a forest of whispering pines, a little frog "
+    "named Pip decided to hop all the way to the moon."
+)
+
+
+def collect(events):
+    async def source():
+        for event in events:
+            yield event
+
+    async def run():
+        return [orjson.loads(frame[len(b"data: "):]) async for frame in stream_story(source())]
+
+    return asyncio.run(run())
+
+
+def chunked(author, text, size):
+    # Partial chunks followed by the aggregated event ADK sends for the message
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    events = [{"author": author, "partial": True, "content": {"parts": [{"text": c}]}} for c in chunks]
+    events.append({"author": author, "content": {"parts": [{"text": text}]}})
+    return events
+
+
+def story_text(frames):
+    return "".join(f["text"] for f in frames if f["type"] == "delta")
+
+
+def test_chunked_story_is_streamed_once():
+    frames = collect(chunked("content_builder", STORY, 10))
+    deltas = [f for f in frames if f["type"] == "delta"]
+    assert len(deltas) > 1
+    assert story_text(frames) == STORY
+    assert frames[-1] == {"type": "end", "rendered_content": None}
+
+
+def test_technical_prefix_split_across_chunks():
+    noise = '---{"status": "fail", "feedback": "Add more jumping and a safer ending."}'
+    frames = collect(chunked("content_builder", noise, 3))
+    assert story_text(frames) == "The story is taking shape..."
+
+
+def test_feedback_in_a_later_chunk_keeps_the_story_whole():
+    story = STORY + ' "Feedback: none!" croaked the owl, and Pip kept hopping.'
+    # 19-character chunks put the whole word in one chunk: ' "Feedback: none!" '
+    frames = collect(chunked("content_builder", story, 19))
+    assert story_text(frames) == story
+
+
+def test_short_whole_message():
+    frames = collect([{"author": "content_builder", "content": {"parts": [{"text": "  The end."}]}}])
+    assert story_text(frames) == "The end."
+
+
+def test_thoughts_and_other_authors_are_skipped():
+    frames = collect([
+        {"author": "judge", "content": {"parts": [{"text": STORY}]}},
+        {"author": "content_builder", "partial": True, "content": {"parts": [{"thought": True, "text": "Plan: frogs"}]}},
+        *chunked("content_builder", STORY, 25),
+    ])
+    assert story_text(frames) == STORY
@@ -1,6 +1,25 @@
 # backend/shared/config.py
+import os
+import re
+from functools import lru_cache
+from textwrap import dedent
+from typing import Optional
+
+from dotenv import load_dotenv
 from google.genai import types
 
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """Loads .env into the process environment, once per process."""
+    load_dotenv()
+
+
+def get_env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Reads a setting, making sure .env has been loaded first."""
+    load_env()
+    return os.getenv(name, default)
+
+
 STRICT_SAFETY = [
     types.SafetySetting(
         category=types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
@@ -18,4 +37,10 @@ STRICT_SAFETY = [
         category=types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
         threshold=types.HarmBlockThreshold.BLOCK_LOW_AND_ABOVE
     ),
-]
\ No newline at end of file
+]
+
+
+def compact_instruction(text: str) -> str:
+    """Dedents an instruction literal and drops trailing whitespace on each line,
+    so indentation in the source is not sent to the model as prompt tokens."""
+    return re.sub(r"[ \t]+\n", "\n", dedent(text)).strip()